@@ -0,0 +1,194 @@
+"""
+Tests for the request cache of `vimeo.VimeoClient`, against a fake transport.
+
+Run with: python -m unittest discover -s tests
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from urlparse import parse_qs, urlsplit
+
+try:
+    from json import dumps as json_encode
+except ImportError:
+    from simplejson import dumps as json_encode
+
+import vimeo
+
+class FakeTransport(object):
+    """
+    Stands in for an `HTTPConnectionPool`. Answers each API method with the
+    response in 'responses' (a dictionary mapping method names to response
+    data, or to a function of the request parameters), and counts requests
+    per method in 'calls'.
+    """
+
+    def __init__(self, responses = None):
+        self.responses = responses or {}
+        self.calls = {}
+
+    def urlopen(self,
+        method,
+        url,
+        body = None,
+        headers = None,
+        timeout = None,
+        deadline = None):
+        params = dict((k, v[0]) for k, v in
+                        parse_qs(urlsplit(url)[3] or body or '').items())
+        api_method = params['method']
+        self.calls[api_method] = self.calls.get(api_method, 0) + 1
+        response = self.responses.get(api_method, {'stat': 'ok'})
+        if callable(response):
+            response = response(params)
+        return json_encode(response)
+
+class CacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = FakeTransport({
+            'vimeo.albums.getVideos': {'stat': 'ok', 'videos': {
+                'total': '2', 'video': [{'id': '5'}, {'id': '6'}]}},
+        })
+        self.client = vimeo.VimeoClient('key', 'secret', 'token', 'ts',
+                                    connection_pool = self.transport)
+        self.client.enable_cache(vimeo.CACHE_MEMORY)
+
+    def calls(self, method):
+        return self.transport.calls.get('vimeo.' + method, 0)
+
+class InvalidationTest(CacheTestCase):
+
+    def test_write_invalidates_video_and_user_entries(self):
+        for i in range(2):
+            self.client.call('videos.getInfo', {'video_id': 5})
+            self.client.call('videos.getInfo', {'video_id': 7})
+            self.client.call('videos.getAll')
+        self.assertEqual(self.calls('videos.getInfo'), 2)
+        self.assertEqual(self.calls('videos.getAll'), 1)
+
+        self.client.call('videos.setTitle', {'video_id': 5, 'title': 'x'})
+        self.client.call('videos.getInfo', {'video_id': 5})
+        self.client.call('videos.getInfo', {'video_id': 7})
+        self.client.call('videos.getAll')
+        self.assertEqual(self.calls('videos.getInfo'), 3)
+        self.assertEqual(self.calls('videos.getAll'), 2)
+
+    def test_write_invalidates_listings_of_video(self):
+        self.client.call('albums.getVideos', {'album_id': 1})
+        self.client.call('videos.addTags', {'video_id': 7, 'tags': 'x'})
+        self.client.call('albums.getVideos', {'album_id': 1})
+        self.assertEqual(self.calls('albums.getVideos'), 1)
+
+        # Video 6 is in the album, so its listing has to go
+        self.client.call('videos.comments.addComment',
+                            {'video_id': 6, 'comment_text': 'x'})
+        self.client.call('albums.getVideos', {'album_id': 1})
+        self.assertEqual(self.calls('albums.getVideos'), 2)
+
+    def test_write_methods_are_not_cached(self):
+        for i in range(2):
+            self.client.call('videos.setTitle', {'video_id': 5, 'title': 'x'})
+        self.assertEqual(self.calls('videos.setTitle'), 2)
+
+    def test_invalidates_cannot_make_writes_cacheable(self):
+        self.client.enable_cache(vimeo.CACHE_MEMORY, invalidates = {
+            'videos.setTitle': ('video_id',),
+        })
+        for i in range(2):
+            self.client.call('videos.delete', {'video_id': 5})
+        self.assertEqual(self.calls('videos.delete'), 2)
+
+class TTLTest(CacheTestCase):
+
+    def test_ttl_lookup(self):
+        self.client.enable_cache(vimeo.CACHE_MEMORY, expire = 100, ttl = {
+            'videos.*': 10,
+            'videos.comments.*': 20,
+            'vimeo.videos.getInfo': 30,
+        }, error_expire = 5, error_ttl = {'videos.getInfo': 1})
+        ttl = self.client._get_cache_ttl
+        self.assertEqual(ttl('vimeo.videos.getInfo'), 30)
+        self.assertEqual(ttl('vimeo.videos.getAll'), 10)
+        self.assertEqual(ttl('vimeo.videos.comments.getList'), 20)
+        self.assertEqual(ttl('vimeo.albums.getAll'), 100)
+        self.assertEqual(ttl('vimeo.videos.getInfo', True), 1)
+        self.assertEqual(ttl('vimeo.videos.getAll', True), 5)
+        self.assertEqual(ttl('vimeo.videos.setTitle'), None)
+        self.assertEqual(ttl('vimeo.videos.upload.getQuota'), None)
+
+    def test_cached_errors_raise(self):
+        self.transport.responses['vimeo.videos.getInfo'] = {
+            'stat': 'fail', 'err': {'code': '1', 'msg': 'Video not found'}}
+        for i in range(2):
+            try:
+                self.client.call('videos.getInfo', {'video_id': 5})
+            except vimeo.VimeoAPIError, e:
+                self.assertEqual(e.code, '1')
+                self.assertEqual(e.msg, 'Video not found')
+            else:
+                self.fail("VimeoAPIError not raised")
+        self.assertEqual(self.calls('videos.getInfo'), 1)
+
+    def test_error_ttl_zero_skips_cache(self):
+        self.client.enable_cache(vimeo.CACHE_MEMORY, error_expire = 0)
+        self.transport.responses['vimeo.videos.getInfo'] = {
+            'stat': 'fail', 'err': {'code': '1', 'msg': 'Video not found'}}
+        for i in range(2):
+            self.assertRaises(vimeo.VimeoAPIError, self.client.call,
+                                'videos.getInfo', {'video_id': 5})
+        self.assertEqual(self.calls('videos.getInfo'), 2)
+
+    def test_zero_ttl_and_never_skip_cache(self):
+        self.client.enable_cache(vimeo.CACHE_MEMORY,
+                    ttl = {'videos.getInfo': 0}, never = ['people.*'])
+        for i in range(2):
+            self.client.call('videos.getInfo', {'video_id': 5})
+            self.client.call('people.getInfo', {'user_id': 1})
+            self.client.call('albums.getAll')
+        self.assertEqual(self.calls('videos.getInfo'), 2)
+        self.assertEqual(self.calls('people.getInfo'), 2)
+        self.assertEqual(self.calls('albums.getAll'), 1)
+        self.assertEqual(len(self.client._cache_backend.keys()), 1)
+
+    def test_upload_methods_skip_cache(self):
+        for i in range(2):
+            self.client.call('videos.upload.getQuota')
+        self.assertEqual(self.calls('videos.upload.getQuota'), 2)
+
+class FileCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_tag_index_is_shared(self):
+        expires = time.time() + 60
+        first = vimeo.FileCache(self.path)
+        first.set('a', 1, expires, [('video_id', '5')])
+        first.set('b', 2, expires, [('video_id', '6')])
+
+        # As if from another process, or after a restart
+        second = vimeo.FileCache(self.path)
+        second.invalidate(('video_id', '5'))
+        self.assertEqual(first.get('a'), None)
+        self.assertEqual(first.get('b'), (2, expires))
+
+    def test_empty_tag_directories_are_removed(self):
+        cache = vimeo.FileCache(self.path)
+        cache.set('a', 1, time.time() + 60, [('video_id', '5'), ('user', 'u')])
+        cache.set('b', 2, time.time() - 60, [('video_id', '6'), ('user', 'u')])
+        self.assertEqual(len(os.listdir(os.path.join(self.path, 'tags'))), 3)
+        cache.purge()
+        self.assertEqual(len(os.listdir(os.path.join(self.path, 'tags'))), 2)
+        cache.delete('a')
+        self.assertEqual(os.listdir(os.path.join(self.path, 'tags')), [])
+
+if __name__ == '__main__':
+    unittest.main()
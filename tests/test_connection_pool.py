@@ -0,0 +1,143 @@
+"""
+Tests for `vimeo.HTTPConnectionPool`, against a local HTTP server.
+
+Run with: python -m unittest discover -s tests
+"""
+
+import BaseHTTPServer
+import os
+import socket
+import SocketServer
+import threading
+import unittest
+import urllib2
+
+from vimeo import HTTPConnectionPool
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """
+    Answers every request with a description of it, except for these paths:
+
+    /redirect/<status> - redirects to /target with that status
+    /drop - answers, then closes the connection without saying so
+    /missing - 404
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    def _respond(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+        self.server.requests.append((self.command, self.path, body,
+                                        self.client_address[1]))
+        if self.path.startswith('/redirect/'):
+            self.send_response(int(self.path.split('/')[2]))
+            self.send_header('Location', '/target')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if self.path == '/missing':
+            self.send_response(404)
+        else:
+            self.send_response(200)
+        data = '%s %s %s' % (self.command, self.path, body)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        if self.path == '/drop':
+            self.close_connection = 1
+
+    do_GET = do_POST = _respond
+
+    def log_message(self, *args):
+        pass
+
+class Server(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+class HTTPConnectionPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = Server(('127.0.0.1', 0), Handler)
+        self.server.requests = []
+        self.thread = threading.Thread(target = self.server.serve_forever)
+        self.thread.start()
+        self.url = 'http://127.0.0.1:%d' % self.server.server_port
+        self.pool = HTTPConnectionPool(timeout = 5)
+        self.environ = os.environ.copy()
+        for k in os.environ.keys():
+            if k.lower().endswith('_proxy'):
+                del os.environ[k]
+
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self.environ)
+        self.pool.clear()
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def ports(self):
+        return [r[3] for r in self.server.requests]
+
+    def test_keep_alive(self):
+        self.assertEqual(self.pool.urlopen('GET', self.url + '/a?b=c'),
+                            'GET /a?b=c ')
+        self.assertEqual(self.pool.urlopen('POST', self.url + '/a', 'x=1',
+                            {'Content-Type': 'text/plain'}), 'POST /a x=1')
+        ports = self.ports()
+        self.assertEqual(ports[0], ports[1])
+
+    def test_dropped_connection_is_retried(self):
+        self.pool.urlopen('GET', self.url + '/drop')
+        self.assertEqual(self.pool.urlopen('GET', self.url + '/a'),
+                            'GET /a ')
+        ports = self.ports()
+        self.assertNotEqual(ports[0], ports[1])
+
+    def test_redirects(self):
+        for status in (301, 302, 303):
+            del self.server.requests[:]
+            self.assertEqual(self.pool.urlopen('POST',
+                                self.url + '/redirect/%d' % status, 'x=1'),
+                                'GET /target ')
+        for status in (307, 308):
+            self.assertEqual(self.pool.urlopen('POST',
+                                self.url + '/redirect/%d' % status, 'x=1'),
+                                'POST /target x=1')
+
+    def test_too_many_redirects(self):
+        pool = HTTPConnectionPool(max_redirects = 0)
+        try:
+            pool.urlopen('GET', self.url + '/redirect/302')
+        except urllib2.HTTPError, e:
+            self.assertEqual(e.code, 302)
+        else:
+            self.fail("HTTPError not raised")
+        pool.clear()
+
+    def test_http_error(self):
+        try:
+            self.pool.urlopen('GET', self.url + '/missing')
+        except urllib2.HTTPError, e:
+            self.assertEqual(e.code, 404)
+            self.assertEqual(e.read(), 'GET /missing ')
+        else:
+            self.fail("HTTPError not raised")
+
+    def test_connection_error(self):
+        # Find a port that nothing is listening on
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+        sock.close()
+        self.assertRaises(urllib2.URLError, self.pool.urlopen, 'GET',
+                            'http://127.0.0.1:%d/' % port)
+
+    def test_proxy(self):
+        os.environ['http_proxy'] = self.url
+        self.assertEqual(self.pool.urlopen('GET', 'http://vimeo.invalid/a'),
+                            'GET http://vimeo.invalid/a ')
+
+if __name__ == '__main__':
+    unittest.main()
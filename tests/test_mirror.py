@@ -0,0 +1,189 @@
+"""
+Tests for `vimeo.mirror.CatalogueMirror`, against a fake client.
+
+Run with: python -m unittest discover -s tests
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from vimeo.mirror import CatalogueMirror
+
+class FakeClient(object):
+    """
+    Answers the listing calls made by `CatalogueMirror` from 'videos',
+    'albums', 'channels' and 'members' (a dictionary mapping album and channel
+    ids to lists of video ids). Methods named in 'fail' raise IOError.
+    'before_call', if set, is called with the method and parameters of each
+    call before it is answered.
+    """
+
+    def __init__(self):
+        self.videos = []
+        self.albums = []
+        self.channels = []
+        self.members = {}
+        self.fail = set()
+        self.before_call = None
+        self.calls = []
+        self.delay = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def call(self, method, params, cache = True):
+        with self._lock:
+            self.calls.append((method, params))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            if self.before_call is not None:
+                self.before_call(method, params)
+            if method in self.fail:
+                raise IOError('%s failed' % method)
+            return self._listing(method, params)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def _listing(self, method, params):
+        if method in ('vimeo.albums.getVideos', 'vimeo.channels.getVideos'):
+            id = params.get('album_id') or params.get('channel_id')
+            items = [{'id': v} for v in self.members[id]]
+            list_key, item_key = 'videos', 'video'
+        else:
+            list_key = method.split('.')[1]
+            item_key = list_key[:-1]
+            items = getattr(self, list_key)
+        start = (params['page'] - 1) * params['per_page']
+        return {'stat': 'ok', list_key: {
+            'total': str(len(items)),
+            item_key: items[start:start + params['per_page']],
+        }}
+
+def video(id, modified = '2014-01-01 00:00:00', duration = 60):
+    return {'id': str(id), 'title': 'Video %s' % id,
+            'modified_date': modified, 'duration': str(duration),
+            'upload_date': '2014-01-01 00:00:00', 'privacy': 'anybody'}
+
+def container(id, videos, modified = '2014-01-01 00:00:00'):
+    return {'id': str(id), 'title': 'Container %s' % id,
+            'last_modified': modified, 'total_videos': str(len(videos))}
+
+class CatalogueMirrorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'catalogue.db')
+        self.client = FakeClient()
+        self.client.videos = [video(i, duration = i * 10)
+                                for i in range(1, 8)]
+        self.client.members = {'a1': ['1', '2'], 'a2': ['3'], 'c1': ['4']}
+        self.client.albums = [container('a1', ['1', '2']),
+                                container('a2', ['3'])]
+        self.client.channels = [container('c1', ['4'])]
+        self.mirror = CatalogueMirror(self.client, self.path, per_page = 3)
+
+    def tearDown(self):
+        self.mirror.close()
+        shutil.rmtree(self.dir)
+
+    def calls(self, method):
+        return [p for m, p in self.client.calls if m == method]
+
+    def test_sync(self):
+        counts = self.mirror.sync()
+        self.assertEqual(counts, {'videos': 7, 'albums': 2, 'channels': 1})
+        self.assertEqual(len(self.calls('vimeo.videos.getAll')), 3)
+        self.assertEqual(self.mirror.get_video(5)['title'], 'Video 5')
+        self.assertEqual(len(self.mirror.get_albums()), 2)
+        self.assertTrue(self.mirror.last_sync())
+
+    def test_find_videos(self):
+        self.mirror.sync()
+        ids = lambda videos: sorted(v['id'] for v in videos)
+        self.assertEqual(ids(self.mirror.find_videos(min_duration = 50)),
+                            ['5', '6', '7'])
+        self.assertEqual(ids(self.mirror.find_videos(album_id = 'a1')),
+                            ['1', '2'])
+        self.assertEqual(ids(self.mirror.find_videos(channel_id = 'c1',
+                            max_duration = 40)), ['4'])
+
+    def test_incremental_sync(self):
+        self.mirror.sync()
+        del self.client.calls[:]
+        self.assertEqual(self.mirror.sync(),
+                            {'videos': 0, 'albums': 0, 'channels': 0})
+        self.assertEqual(self.calls('vimeo.albums.getVideos'), [])
+
+        self.client.videos[0] = video(1, modified = '2014-02-01 00:00:00')
+        del self.client.videos[-1]
+        self.client.members['a2'] = ['3', '5']
+        self.client.albums[1] = container('a2', ['3', '5'])
+        del self.client.calls[:]
+        self.assertEqual(self.mirror.sync(),
+                            {'videos': 2, 'albums': 1, 'channels': 0})
+        self.assertEqual(self.calls('vimeo.albums.getVideos'),
+                            [{'album_id': 'a2', 'page': 1, 'per_page': 3}])
+        self.assertEqual(self.mirror.get_video(7), None)
+        self.assertEqual(
+            sorted(v['id'] for v in self.mirror.find_videos(album_id = 'a2')),
+            ['3', '5'])
+
+    def test_failed_sync_rolls_back(self):
+        self.mirror.sync()
+        self.client.members['a1'] = ['1', '2', '6']
+        self.client.albums[0] = container('a1', ['1', '2', '6'])
+        self.client.videos[0] = video(1, modified = '2014-02-01 00:00:00')
+        self.client.fail.add('vimeo.albums.getVideos')
+        self.assertRaises(IOError, self.mirror.sync)
+        self.assertEqual(self.mirror.get_video(1)['modified_date'],
+                            '2014-01-01 00:00:00')
+
+        # The album wasn't recorded as synced, so it's fetched again
+        self.client.fail.clear()
+        self.assertEqual(self.mirror.sync(),
+                            {'videos': 1, 'albums': 1, 'channels': 0})
+        self.assertEqual(
+            len(self.mirror.find_videos(album_id = 'a1')), 3)
+
+    def test_listing_shifting_during_sync(self):
+        self.client.videos.extend([video(8), video(9)])
+        self.mirror.sync()
+        self.assertEqual(len(self.mirror.find_videos()), 9)
+
+        # A video is uploaded (and listed first) once the first page has been
+        # fetched, pushing video 9 off the last page
+        def upload(method, params):
+            if method == 'vimeo.videos.getAll' and params['page'] == 2 and \
+            self.client.videos[0]['id'] != '10':
+                self.client.videos.insert(0, video(10))
+        self.client.before_call = upload
+        self.mirror.sync()
+        self.assertEqual(self.mirror.get_video(9)['id'], '9')
+
+        self.client.before_call = None
+        self.mirror.sync()
+        self.assertEqual(len(self.mirror.find_videos()), 10)
+
+        # Videos deleted meanwhile are removed once a listing is complete
+        del self.client.videos[0]
+        self.mirror.sync()
+        self.assertEqual(self.mirror.get_video(10), None)
+
+    def test_container_videos_fetched_in_parallel(self):
+        self.client.albums = [container('a%d' % i, ['1']) for i in range(8)]
+        for i in range(8):
+            self.client.members['a%d' % i] = ['1']
+        self.client.delay = 0.05
+        self.mirror.sync()
+        self.assertEqual(len(self.calls('vimeo.albums.getVideos')), 8)
+        self.assertEqual(self.client.max_active, self.mirror.workers)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Tests for cache snapshots and for recording and replaying requests.
+
+Run with: python -m unittest discover -s tests
+"""
+
+import itertools
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from StringIO import StringIO
+
+import vimeo
+
+from test_cache import FakeTransport
+
+class SnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.transport = FakeTransport()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def client(self, token = 'token'):
+        return vimeo.VimeoClient('key', 'secret', token, 'ts',
+                                    connection_pool = self.transport)
+
+    def test_export_import(self):
+        client = self.client()
+        client.enable_cache(vimeo.CACHE_MEMORY)
+        client.call('videos.getInfo', {'video_id': 5})
+        client.call('videos.getAll')
+        # Expired entries aren't exported
+        client._cache_backend.set('old', {'stat': 'ok'}, time.time() - 1)
+        snapshot = StringIO()
+        self.assertEqual(client.export_cache(snapshot), 2)
+
+        other = self.client()
+        other.enable_cache(vimeo.CACHE_FILE, self.path)
+        self.assertEqual(other.import_cache(StringIO(snapshot.getvalue())), 2)
+        other.call('videos.getInfo', {'video_id': 5})
+        other.call('videos.getAll')
+        self.assertEqual(self.transport.calls, {
+            'vimeo.videos.getInfo': 1, 'vimeo.videos.getAll': 1})
+
+        # Tags survive the trip
+        other.call('videos.setTitle', {'video_id': 5, 'title': 'x'})
+        other.call('videos.getInfo', {'video_id': 5})
+        self.assertEqual(self.transport.calls['vimeo.videos.getInfo'], 2)
+
+    def test_import_needs_cache(self):
+        client = self.client()
+        self.assertRaises(ValueError, client.import_cache, StringIO())
+
+    def test_record_replay(self):
+        counter = itertools.count(1)
+        self.transport.responses['vimeo.videos.getInfo'] = \
+            lambda params: {'stat': 'ok', 'n': counter.next()}
+        path = os.path.join(self.path, 'recording')
+
+        recorder = vimeo.RecordingTransport(path, self.transport)
+        first, second = self.client('first'), self.client('second')
+        for client in (first, second):
+            client._connection_pool = recorder
+        call = lambda c: c.call('videos.getInfo', {'video_id': 5})['n']
+        self.assertEqual([call(first), call(second), call(first)], [1, 2, 3])
+        recorder.save()
+
+        replay = vimeo.ReplayTransport(path)
+        for client in (first, second):
+            client._connection_pool = replay
+        self.assertEqual([call(second), call(first), call(first)], [2, 1, 3])
+        # The last response is repeated
+        self.assertEqual(call(first), 3)
+        replay.rewind()
+        self.assertEqual(call(first), 1)
+        self.assertRaises(KeyError, first.call, 'videos.getAll')
+        self.assertEqual(self.transport.calls['vimeo.videos.getInfo'], 3)
+
+if __name__ == '__main__':
+    unittest.main()
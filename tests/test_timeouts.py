@@ -0,0 +1,186 @@
+"""
+Tests for deadlines and hedged requests, against a local HTTP server.
+
+Run with: python -m unittest discover -s tests
+"""
+
+import socket
+import threading
+import time
+import unittest
+
+import vimeo
+
+class SlowServer(object):
+    """
+    A keep-alive HTTP server that waits 'delay' seconds before answering, then
+    sends the response body a byte every 'trickle' seconds.
+    """
+
+    def __init__(self, body = '{"stat": "ok"}', delay = 0, trickle = 0):
+        self.body = body
+        self.delay = delay
+        # Delays for the next requests, before falling back to 'delay'
+        self.delays = []
+        self.trickle = trickle
+        self.requests = 0
+        self.sock = socket.socket()
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen(50)
+        self.url = 'http://127.0.0.1:%d/' % self.sock.getsockname()[1]
+        thread = threading.Thread(target = self._accept)
+        thread.setDaemon(True)
+        thread.start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn = self.sock.accept()[0]
+            except socket.error:
+                return
+            thread = threading.Thread(target = self._serve, args = (conn,))
+            thread.setDaemon(True)
+            thread.start()
+
+    def _serve(self, conn):
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        data = ''
+        try:
+            while True:
+                while '\r\n\r\n' not in data:
+                    chunk = conn.recv(65536)
+                    if not chunk:
+                        return
+                    data += chunk
+                data = data.split('\r\n\r\n', 1)[1]
+                self.requests += 1
+                if self.delays:
+                    time.sleep(self.delays.pop(0))
+                else:
+                    time.sleep(self.delay)
+                conn.sendall('HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n'
+                                % len(self.body))
+                if self.trickle:
+                    for c in self.body:
+                        conn.sendall(c)
+                        time.sleep(self.trickle)
+                else:
+                    conn.sendall(self.body)
+        except socket.error:
+            pass
+        finally:
+            conn.close()
+
+    def close(self):
+        self.sock.close()
+
+class DeadlineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = vimeo.HTTPConnectionPool()
+
+    def tearDown(self):
+        self.pool.clear()
+
+    def test_deadline_caps_trickling_response(self):
+        server = SlowServer(trickle = 0.1)
+        started = time.time()
+        self.assertRaises(vimeo.VimeoDeadlineError, self.pool.urlopen, 'GET',
+                            server.url, deadline = time.time() + 0.5)
+        self.assertTrue(time.time() - started < 0.7)
+        server.close()
+
+    def test_deadline_is_a_timeout(self):
+        server = SlowServer(delay = 0.3)
+        self.assertRaises(socket.timeout, self.pool.urlopen, 'GET',
+                            server.url, deadline = time.time() + 0.1)
+        self.assertEqual(self.pool.urlopen('GET', server.url,
+                            deadline = time.time() + 5), '{"stat": "ok"}')
+        server.close()
+
+    def test_response_read_as_deadline_passes(self):
+        # The watchdog fires just after the response has been read
+        server = SlowServer()
+        done = self.pool._watchdog.done
+        self.pool._watchdog.done = lambda watch: done(watch) or True
+        self.assertEqual(self.pool.urlopen('GET', server.url,
+                            deadline = time.time() + 5), '{"stat": "ok"}')
+        # The connection was shut down, so it isn't reused
+        self.assertFalse([c for c in self.pool._idle.values() if c])
+        server.close()
+
+    def test_watchdog(self):
+        class Conn(object):
+            class sock(object):
+                shutdowns = []
+                @classmethod
+                def shutdown(cls, how):
+                    cls.shutdowns.append(how)
+        watchdog = vimeo._Watchdog()
+        early = watchdog.watch(time.time() + 0.05, Conn)
+        late = watchdog.watch(time.time() + 0.2, Conn)
+        self.assertEqual(watchdog.done(late), False)
+        time.sleep(0.4)
+        self.assertEqual(watchdog.done(early), True)
+        self.assertEqual(Conn.sock.shutdowns, [socket.SHUT_RDWR])
+
+    def test_deadline_does_not_open_breaker(self):
+        server = SlowServer(delay = 0.2)
+        client = vimeo.VimeoClient('key', 'secret',
+                                    connection_pool = self.pool)
+        client.set_circuit_breaker(2)
+        for i in range(3):
+            self.assertRaises(vimeo.VimeoDeadlineError, client.call,
+                        'videos.getInfo', url = server.url, deadline = 0.05)
+        self.assertEqual(client.call('videos.getInfo', url = server.url),
+                            {'stat': 'ok'})
+        server.close()
+
+class HedgeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = SlowServer()
+        self.pool = vimeo.HTTPConnectionPool()
+        self.client = vimeo.VimeoClient('key', 'secret',
+                                        connection_pool = self.pool)
+        self.client.set_timeout(hedge_percentile = 90)
+        # Response times are shared by all clients; keep each test's apart
+        self.method = 'test.%s' % self.id()
+        for i in range(vimeo.HEDGE_MIN_SAMPLES):
+            self.call()
+
+    def tearDown(self):
+        self.pool.clear()
+        self.server.close()
+
+    def call(self, **kwargs):
+        return self.client.call(self.method, url = self.server.url, **kwargs)
+
+    def test_slow_request_is_hedged(self):
+        requests = self.server.requests
+        self.server.delays = [0.5]
+        started = time.time()
+        self.assertEqual(self.call(), {'stat': 'ok'})
+        self.assertTrue(time.time() - started < 0.3)
+        self.assertEqual(self.server.requests, requests + 2)
+
+    def test_hedge_limit(self):
+        self.client.set_timeout(hedge_percentile = 90, hedge_limit = 0.1)
+        requests = self.server.requests
+        self.server.delay = 0.1
+        for i in range(5):
+            self.call()
+        # 20 warm-up calls, so only 2 of the next 5 may be hedged
+        self.assertEqual(self.server.requests, requests + 7)
+
+    def test_failures_count_towards_response_times(self):
+        self.server.delay = 0.3
+        for i in range(vimeo.HEDGE_MIN_SAMPLES):
+            self.assertRaises(socket.timeout, self.call, timeout = 0.05,
+                                hedge = False)
+        self.assertTrue(self.client._get_hedge_delay(
+                            'vimeo.' + self.method) >= 0.05)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -15,22 +15,39 @@ Released under the MIT or GPLv3 licenses.
 from __future__ import with_statement
 
 import binascii
+import fnmatch
 import hashlib
+import heapq
 import hmac
+import httplib
+import itertools
 import mimetypes
 import os
+import Queue
+import re
+import shutil
 import socket
 import string
+import sys
+import threading
 import time
 import urllib
 import urllib2
 import uuid
+import zlib
+
+from urlparse import urljoin, urlsplit
 
 try:
     from urlparse import parse_qs
 except ImportError:
     from cgi import parse_qs
 
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from StringIO import StringIO
+
 try:
     import cPickle as pickle
 except ImportError:
@@ -50,7 +67,10 @@ except ImportError:
     except ImportError:
         raise ImportError("Could not find a json library to import.")
 
-__all__ = ['VimeoClient', 'VimeoAPIError']
+__all__ = ['VimeoClient', 'VimeoClientPool', 'VimeoAPIError',
+           'VimeoCircuitOpenError', 'VimeoDeadlineError', 'CircuitBreaker',
+           'HTTPConnectionPool', 'MemoryCache', 'FileCache',
+           'RecordingTransport', 'ReplayTransport']
 
 # Data values used as defaults
 API_REST_URL = 'http://vimeo.com/api/rest/v2'
@@ -64,6 +84,132 @@ CACHE_MEMORY = 'memory'
 # Strip these parameters from requests when caching
 CACHE_DROP_PARAMETERS = ('oauth_nonce', 'oauth_signature', 'oauth_timestamp')
 
+# Error responses are cached for this many seconds by default
+CACHE_ERROR_EXPIRE = 30
+
+# Responses to methods matching these names or glob patterns are never cached.
+# (Responses to the methods in `CACHE_WRITE_METHODS` aren't either.)
+CACHE_NEVER = ('vimeo.videos.upload.*',)
+
+# HTTP statuses that `HTTPConnectionPool` follows to another URL
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+# Hedged requests are only sent once this many response times have been seen
+# for a method.
+HEDGE_MIN_SAMPLES = 20
+
+# Percentile of recent response times used as the hedge delay when hedging is
+# requested for a single call
+HEDGE_PERCENTILE = 95
+
+# At most this fraction of recent calls to a method are hedged, so that a
+# general slowdown doesn't double the load on the API.
+HEDGE_LIMIT = 0.1
+
+# Format version of cache snapshots and request recordings
+SNAPSHOT_VERSION = 1
+
+# Finds the token in an OAuth "Authorization" header
+AUTH_TOKEN_RE = re.compile(r'[ ,]oauth_token="([^"]*)"')
+
+# Cached responses are indexed by these parameters, so that write methods can
+# invalidate the entries for the entities they change. Responses for requests
+# without any of them (like `videos.getAll`) are indexed under 'user' instead:
+# both the 'user_id' parameter, if any, and the token's user.
+CACHE_INDEX_PARAMETERS = ('video_id', 'album_id', 'channel_id', 'group_id')
+
+# The entities whose cached responses are invalidated by a successful call to
+# each write method.
+CACHE_INVALIDATES = {
+    'vimeo.albums.addVideo': ('album_id', 'video_id', 'user'),
+    'vimeo.albums.create': ('user',),
+    'vimeo.albums.delete': ('album_id', 'user'),
+    'vimeo.albums.removeVideo': ('album_id', 'video_id', 'user'),
+    'vimeo.albums.setDescription': ('album_id', 'user'),
+    'vimeo.albums.setPassword': ('album_id', 'user'),
+    'vimeo.albums.setTitle': ('album_id', 'user'),
+    'vimeo.channels.addVideo': ('channel_id', 'video_id'),
+    'vimeo.channels.removeVideo': ('channel_id', 'video_id'),
+    'vimeo.channels.subscribe': ('channel_id', 'user'),
+    'vimeo.channels.unsubscribe': ('channel_id', 'user'),
+    'vimeo.groups.addVideo': ('group_id', 'video_id'),
+    'vimeo.groups.join': ('group_id', 'user'),
+    'vimeo.groups.leave': ('group_id', 'user'),
+    'vimeo.people.addContact': ('user',),
+    'vimeo.people.addSubscription': ('user',),
+    'vimeo.people.removeContact': ('user',),
+    'vimeo.people.removeSubscription': ('user',),
+    'vimeo.videos.addCast': ('video_id',),
+    'vimeo.videos.addTags': ('video_id', 'user'),
+    'vimeo.videos.clearTags': ('video_id', 'user'),
+    'vimeo.videos.comments.addComment': ('video_id',),
+    'vimeo.videos.comments.deleteComment': ('video_id',),
+    'vimeo.videos.comments.editComment': ('video_id',),
+    'vimeo.videos.delete': ('video_id', 'user'),
+    'vimeo.videos.embed.setPreset': ('video_id',),
+    'vimeo.videos.removeCast': ('video_id',),
+    'vimeo.videos.removeTag': ('video_id', 'user'),
+    'vimeo.videos.setDescription': ('video_id', 'user'),
+    'vimeo.videos.setDownloadPrivacy': ('video_id',),
+    'vimeo.videos.setLike': ('video_id', 'user'),
+    'vimeo.videos.setPrivacy': ('video_id', 'user'),
+    'vimeo.videos.setTitle': ('video_id', 'user'),
+    'vimeo.videos.upload.complete': ('user',),
+}
+
+# Methods that change data. Their responses are never cached, and they are never
+# sent twice by hedging, whatever 'invalidates' mapping is passed to
+# `VimeoClient.enable_cache`. (Methods in that mapping are treated as writes
+# too.)
+CACHE_WRITE_METHODS = frozenset(CACHE_INVALIDATES)
+
+def _dump_snapshot(data, file):
+    """
+    Write 'data' to 'file' (a path or file-like object) as a compressed pickle.
+    """
+    data = zlib.compress(pickle.dumps((SNAPSHOT_VERSION, data),
+                                            pickle.HIGHEST_PROTOCOL))
+    if hasattr(file, 'write'):
+        file.write(data)
+    else:
+        with open(file, 'wb') as fp:
+            fp.write(data)
+
+def _load_snapshot(file):
+    """
+    Read data written by `_dump_snapshot` from 'file' (a path or file-like
+    object).
+    """
+    if hasattr(file, 'read'):
+        data = file.read()
+    else:
+        with open(file, 'rb') as fp:
+            data = fp.read()
+    version, data = pickle.loads(zlib.decompress(data))
+    if version != SNAPSHOT_VERSION:
+        raise ValueError("Unsupported snapshot version: %r" % (version,))
+    return data
+
+def _match_method(table, method, default = None):
+    """
+    Look up an API method in a dictionary keyed by method names or glob
+    patterns (like 'vimeo.videos.*'). The 'vimeo.' prefix is optional in the
+    keys. Exact names win over patterns, and longer patterns win over shorter
+    ones.
+    """
+    patterns = []
+    for k, v in table.items():
+        if not k.startswith('vimeo.'):
+            k = 'vimeo.' + k
+        if k == method:
+            return v
+        patterns.append((len(k), k, v))
+    patterns.sort(reverse = True)
+    for _, k, v in patterns:
+        if fnmatch.fnmatchcase(method, k):
+            return v
+    return default
+
 class VimeoAPIError(Exception):
     """
     A subclass of Exception that provides the api method, error code, and error
@@ -78,13 +224,789 @@ class VimeoAPIError(Exception):
     def __str__(self):
         return " (%s) %s %s" % (self.method or 'None', self.code, self.msg)
 
+class VimeoCircuitOpenError(VimeoAPIError):
+    """
+    Raised instead of making a request while the circuit breaker for an API
+    method or endpoint is open, if there's no stale cached response to return.
+    """
+
+class VimeoDeadlineError(socket.timeout):
+    """
+    Raised when a call's own deadline (see `VimeoClient.set_timeout`) passes
+    before the response has been read. Unlike other timeouts, it doesn't count
+    as a failure of the API for circuit breaking.
+    """
+
+class CircuitBreaker(object):
+    """
+    Tracks consecutive failures of the requests to an API method or endpoint.
+    After 'threshold' failures in a row the circuit opens, and requests fail
+    fast for 'reset_timeout' seconds. After that a single probe request is let
+    through (the circuit is half-open): the circuit closes again if it
+    succeeds, and reopens if it fails.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __repr__(self):
+        return "<CircuitBreaker: %s>" % self.state
+
+    def __init__(self, threshold = 5, reset_timeout = 30):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Return True if a request should be made.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and \
+            time.time() >= self.opened_at + self.reset_timeout:
+                # Let a single probe through
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                self.state = self.OPEN
+                self.opened_at = time.time()
+
+    def release(self):
+        """
+        Record a request whose outcome says nothing about the API (because the
+        caller gave up on it, say). If it was the probe of a half-open circuit,
+        another probe is let through.
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+
+def _is_outage(e):
+    """
+    Return True if the exception 'e' suggests that the API is unavailable,
+    rather than that a particular request was wrong. A caller's own deadline
+    running out doesn't.
+    """
+    if isinstance(e, VimeoDeadlineError):
+        return False
+    if isinstance(e, urllib2.HTTPError):
+        return e.code >= 500
+    return isinstance(e, (socket.error, httplib.HTTPException,
+                                                urllib2.URLError))
+
+class _Watchdog(object):
+    """
+    Shuts down the sockets of requests whose deadlines have passed. Socket
+    timeouts only limit each read, so without this a slowly trickling response
+    could outlast its deadline. A single thread watches every request.
+    """
+
+    def __init__(self):
+        # Heap of [deadline, sequence number, connection, state] watches
+        self._watches = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def watch(self, deadline, conn):
+        """
+        Start watching a request on 'conn'. Returns a watch to pass to `done`.
+        """
+        watch = [deadline, self._counter.next(), conn, None]
+        with self._cond:
+            heapq.heappush(self._watches, watch)
+            if self._thread is None:
+                self._thread = threading.Thread(target = self._run)
+                self._thread.setDaemon(True)
+                self._thread.start()
+            elif self._watches[0] is watch:
+                # The thread is waiting for a later deadline
+                self._cond.notify()
+        return watch
+
+    def done(self, watch):
+        """
+        Stop watching a request. Returns True if its deadline had already
+        passed and its socket was shut down.
+        """
+        with self._cond:
+            if watch[3] is None:
+                watch[3] = 'done'
+            # Keep the heap short; the thread skips any others
+            while self._watches and self._watches[0][3] == 'done':
+                heapq.heappop(self._watches)
+                if not self._watches:
+                    # Nothing left to time; stop the thread polling
+                    self._cond.notify()
+            return watch[3] == 'expired'
+
+    def _run(self):
+        with self._cond:
+            while True:
+                while self._watches and self._watches[0][3] == 'done':
+                    heapq.heappop(self._watches)
+                if not self._watches:
+                    self._cond.wait()
+                    continue
+                delay = self._watches[0][0] - time.time()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                watch = heapq.heappop(self._watches)
+                watch[3] = 'expired'
+                try:
+                    watch[2].sock.shutdown(socket.SHUT_RDWR)
+                except (AttributeError, socket.error):
+                    pass
+
+class HTTPConnectionPool(object):
+    """
+    A small, thread-safe pool of persistent `httplib` connections, keyed by
+    scheme, host and port. Connections are returned to the pool once their
+    response has been read in full, so consecutive requests to the API skip the
+    TCP (and TLS) handshake. Idle connections beyond 'maxsize' per host are
+    closed.
+
+    'timeout' can be a number of seconds, or a 2-tuple of separate (connect,
+    read) timeouts.
+    """
+
+    def __init__(self, maxsize = 10, timeout = 30, max_redirects = 5):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+        self._idle = {}
+        self._lock = threading.Lock()
+        self._watchdog = _Watchdog()
+
+    def _new_connection(self, key, timeout):
+        scheme, host, port = key
+        if scheme == 'https':
+            cls = httplib.HTTPSConnection
+        else:
+            cls = httplib.HTTPConnection
+        try:
+            conn = cls(host, port, timeout = timeout)
+        except TypeError:
+            # Old version of Python that doesn't accept a timeout argument
+            conn = cls(host, port)
+            conn.connect()
+            conn.sock.settimeout(timeout)
+        return conn
+
+    def _get_connection(self, key, timeout):
+        """
+        Return a 2-tuple of (connection, reused), where 'reused' is True if the
+        connection was taken from the idle pool rather than newly created.
+        """
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+        return self._new_connection(key, timeout), False
+
+    def _put_connection(self, key, conn):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.maxsize:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def clear(self):
+        """
+        Close all idle connections.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+    def urlopen(self,
+        method,
+        url,
+        body = None,
+        headers = None,
+        timeout = None,
+        deadline = None):
+        """
+        Make an HTTP request and return the response body as a string. Like
+        `urllib2.urlopen`, redirects are followed, a `urllib2.HTTPError` is
+        raised for other responses with a status of 300 or more, and a
+        `urllib2.URLError` for connection failures. Requests that should go
+        through a proxy (according to the `*_proxy` environment variables) are
+        made with `urllib2` instead of over pooled connections.
+
+        'timeout' overrides the pool's timeout for this request. 'deadline', if
+        set, is the time (as returned by `time.time`) by which the request must
+        complete, including reading the whole response; `VimeoDeadlineError`
+        (a subclass of `socket.timeout`) is raised if it passes.
+        """
+        if timeout is None:
+            timeout = self.timeout
+        if isinstance(timeout, tuple):
+            connect_timeout, read_timeout = timeout
+        else:
+            connect_timeout = read_timeout = timeout
+        headers = dict(headers or {})
+
+        for i in range(self.max_redirects + 1):
+            scheme, netloc, path, query, _ = urlsplit(url)
+            # Split the port manually; `SplitResult.port` needs Python 2.6+
+            host, _, port = netloc.partition(':')
+
+            if scheme in urllib.getproxies() and not urllib.proxy_bypass(host):
+                if deadline is not None:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise VimeoDeadlineError("Deadline exceeded")
+                    read_timeout = min(read_timeout, remaining)
+                return self._proxy_urlopen(url, body, headers, read_timeout)
+
+            port = int(port or (scheme == 'https' and 443 or 80))
+            key = (scheme, host, port)
+            path = path or '/'
+            if query:
+                path += '?' + query
+
+            try:
+                response, data = self._send(key, method, path, body, headers,
+                                    connect_timeout, read_timeout, deadline)
+            except socket.timeout:
+                raise
+            except (socket.error, httplib.HTTPException):
+                # Raise what `urllib2.urlopen` would, for existing callers
+                raise urllib2.URLError(sys.exc_info()[1])
+
+            location = response.getheader('location')
+            if response.status in REDIRECT_CODES and location:
+                url = urljoin(url, location)
+                # Like `urllib2`, redirect POSTs as GETs, except for 307/308
+                if method == 'POST' and response.status in (301, 302, 303):
+                    method = 'GET'
+                    body = None
+                    headers.pop('Content-Type', None)
+                continue
+
+            if response.status >= 300:
+                raise urllib2.HTTPError(url, response.status, response.reason,
+                                response.msg, StringIO(data))
+            return data
+
+        raise urllib2.HTTPError(url, response.status,
+            "Too many redirects", response.msg, StringIO(data))
+
+    def _send(self,
+        key,
+        method,
+        path,
+        body,
+        headers,
+        connect_timeout,
+        read_timeout,
+        deadline):
+        """
+        Send a single request over a pooled connection, and return a 2-tuple
+        of the `httplib.HTTPResponse` and its body.
+        """
+        while True:
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise VimeoDeadlineError("Deadline exceeded")
+                connect_timeout = min(connect_timeout, remaining)
+                read_timeout = min(read_timeout, remaining)
+
+            conn, reused = self._get_connection(key, connect_timeout)
+            watch = None
+            if deadline is not None:
+                watch = self._watchdog.watch(deadline, conn)
+            expired = False
+            try:
+                try:
+                    if conn.sock is None:
+                        conn.connect()
+                    conn.sock.settimeout(read_timeout)
+                    conn.request(method, path, body, headers)
+                    response = conn.getresponse()
+                    data = response.read()
+                finally:
+                    if watch is not None:
+                        expired = self._watchdog.done(watch)
+            except socket.timeout:
+                conn.close()
+                if expired or \
+                (deadline is not None and time.time() >= deadline):
+                    # The read timeout was cut short by the deadline
+                    raise VimeoDeadlineError("Deadline exceeded")
+                raise
+            except (socket.error, httplib.HTTPException):
+                conn.close()
+                if expired:
+                    raise VimeoDeadlineError("Deadline exceeded")
+                # The server may have dropped an idle keep-alive connection.
+                # Retry once on a fresh connection in that case only.
+                if reused:
+                    continue
+                raise
+            break
+
+        if response.will_close or expired:
+            # If the deadline passed just as the response was read, it's
+            # still complete, but the socket has been shut down.
+            conn.close()
+        else:
+            self._put_connection(key, conn)
+        return response, data
+
+    def _proxy_urlopen(self, url, body, headers, timeout):
+        """
+        Make a request through `urllib2`, which handles proxies.
+        """
+        request = urllib2.Request(url, body, headers)
+        try:
+            response = urllib2.urlopen(request, timeout = timeout)
+        except TypeError:
+            # Old version of Python that doesn't accept a timeout argument
+            response = urllib2.urlopen(request)
+        return response.read()
+
+class MemoryCache(object):
+    """
+    A cache backend that stores entries in a dictionary. Entries can be tagged
+    so that related entries can be removed together with `invalidate`.
+
+    Expired entries are still returned by `get` (the client decides what to do
+    with them), and are removed by a periodic `purge` at most once every
+    'purge_interval' seconds, once they have been expired for 'grace' seconds.
+    """
+
+    type = CACHE_MEMORY
+
+    def __init__(self, purge_interval = 60, grace = 0):
+        self.purge_interval = purge_interval
+        self.grace = grace
+        self._data = {}
+        self._tags = {}
+        self._next_purge = time.time() + purge_interval
+        self._lock = threading.RLock()
+
+    def get(self, key):
+        """
+        Return a 2-tuple of (value, expires), or None if there is no entry.
+        """
+        entry = self._data.get(key)
+        if entry is not None:
+            return entry[:2]
+
+    def set(self, key, value, expires, tags = ()):
+        with self._lock:
+            self._discard(key)
+            self._data[key] = (value, expires, tuple(tags))
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+        if time.time() >= self._next_purge:
+            self.purge()
+
+    def _discard(self, key):
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            for tag in entry[2]:
+                keys = self._tags.get(tag)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._tags[tag]
+
+    def delete(self, key):
+        with self._lock:
+            self._discard(key)
+
+    def invalidate(self, tag):
+        """
+        Remove every entry carrying 'tag'.
+        """
+        with self._lock:
+            for key in list(self._tags.get(tag, ())):
+                self._discard(key)
+
+    def keys(self):
+        return self._data.keys()
+
+    def items(self):
+        """
+        Return a list of (key, value, expires, tags) tuples for every entry.
+        """
+        return [(k,) + entry for k, entry in self._data.items()]
+
+    def purge(self, before = None):
+        """
+        Remove entries that expired before the timestamp 'before' (which
+        defaults to 'grace' seconds ago).
+        """
+        now = time.time()
+        if before is None:
+            before = now - self.grace
+        with self._lock:
+            self._next_purge = now + self.purge_interval
+            for key, entry in self._data.items():
+                if entry[1] < before:
+                    self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._data = {}
+            self._tags = {}
+
+class FileCache(MemoryCache):
+    """
+    A cache backend that pickles entries to '.cache' files in a directory. The
+    modification time of each file is set to the entry's expiry time so that
+    `purge` doesn't need to unpickle anything.
+
+    The tag index is kept on disk as well, as a 'tags' subdirectory holding a
+    directory of empty marker files (named after the keys) for each tag. This
+    lets `invalidate` remove entries written by other processes sharing the
+    directory, or before a restart. A tag's directory is removed along with
+    its last entry.
+    """
+
+    type = CACHE_FILE
+
+    def __init__(self, path = '.', purge_interval = 60, grace = 0):
+        MemoryCache.__init__(self, purge_interval, grace)
+        self.path = path
+        self._tags_path = os.path.join(path, 'tags')
+
+    def _filename(self, key):
+        return os.path.join(self.path, key + '.cache')
+
+    def _tag_path(self, tag):
+        return os.path.join(self._tags_path, hashlib.md5(repr(tag)).hexdigest())
+
+    def _load(self, key):
+        try:
+            with open(self._filename(key), 'rb') as fp:
+                return pickle.load(fp)
+        except (IOError, OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def get(self, key):
+        entry = self._load(key)
+        if entry is not None:
+            return entry[:2]
+
+    def set(self, key, value, expires, tags = ()):
+        f = self._filename(key)
+        with open(f, 'wb') as fp:
+            pickle.dump((value, expires, tuple(tags)), fp,
+                                            pickle.HIGHEST_PROTOCOL)
+        os.utime(f, (expires, expires))
+        for tag in tags:
+            d = self._tag_path(tag)
+            marker = os.path.join(d, key)
+            try:
+                open(marker, 'w').close()
+            except IOError:
+                try:
+                    os.makedirs(d)
+                except OSError:
+                    # Another process got there first
+                    pass
+                open(marker, 'w').close()
+        if time.time() >= self._next_purge:
+            self.purge()
+
+    def _discard(self, key):
+        entry = self._load(key)
+        try:
+            os.remove(self._filename(key))
+        except OSError:
+            pass
+        if entry is not None:
+            for tag in entry[2]:
+                d = self._tag_path(tag)
+                try:
+                    os.remove(os.path.join(d, key))
+                    # Fails unless this was the tag's last entry
+                    os.rmdir(d)
+                except OSError:
+                    pass
+
+    def invalidate(self, tag):
+        d = self._tag_path(tag)
+        try:
+            keys = os.listdir(d)
+        except OSError:
+            return
+        with self._lock:
+            for key in keys:
+                self._discard(key)
+                # Markers can outlive their entries
+                try:
+                    os.remove(os.path.join(d, key))
+                except OSError:
+                    pass
+            try:
+                os.rmdir(d)
+            except OSError:
+                pass
+
+    def keys(self):
+        files = [f for f in os.listdir(self.path) if f.endswith('.cache')]
+        return [f[:-len('.cache')] for f in files]
+
+    def items(self):
+        items = []
+        for key in self.keys():
+            entry = self._load(key)
+            if entry is not None:
+                items.append((key,) + tuple(entry))
+        return items
+
+    def purge(self, before = None):
+        now = time.time()
+        if before is None:
+            before = now - self.grace
+        with self._lock:
+            self._next_purge = now + self.purge_interval
+            for key in self.keys():
+                try:
+                    expires = os.path.getmtime(self._filename(key))
+                except OSError:
+                    continue
+                if expires < before:
+                    self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            for key in self.keys():
+                self._discard(key)
+            shutil.rmtree(self._tags_path, True)
+
+class RecordingTransport(object):
+    """
+    Wraps an `HTTPConnectionPool` (or another transport) and records every
+    response, so that a `ReplayTransport` can play the traffic back later.
+    Recordings are written to 'path' by `save`. If 'path' already exists, new
+    responses are added to the recordings in it.
+
+    Requests are matched on their method, URL and body, ignoring the OAuth
+    parameters that differ between otherwise identical requests.
+    """
+
+    def __init__(self, path, transport = None):
+        self.path = path
+        self.transport = transport or HTTPConnectionPool()
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            self.recordings = _load_snapshot(path)
+        else:
+            self.recordings = {}
+
+    def urlopen(self,
+        method,
+        url,
+        body = None,
+        headers = None,
+        timeout = None,
+        deadline = None):
+        error = None
+        try:
+            data = self.transport.urlopen(method, url, body, headers, timeout,
+                                                                    deadline)
+            response = (200, None, data)
+        except urllib2.HTTPError:
+            error = sys.exc_info()[1]
+            data = error.read()
+            response = (error.code, error.msg, data)
+
+        key = _recording_key(method, url, body, headers)
+        with self._lock:
+            self.recordings.setdefault(key, []).append(response)
+
+        if error is not None:
+            # The original error's body has been read; raise a fresh copy
+            raise urllib2.HTTPError(error.filename, error.code, error.msg,
+                                            error.hdrs, StringIO(data))
+        return data
+
+    def save(self):
+        """
+        Write the recordings to 'path'.
+        """
+        with self._lock:
+            _dump_snapshot(self.recordings, self.path)
+
+class ReplayTransport(object):
+    """
+    Plays back the responses recorded by a `RecordingTransport`, without making
+    any network requests. When the same request was recorded more than once, the
+    responses are returned in the order they were recorded, and the last one is
+    repeated after that. A `KeyError` is raised for requests that weren't
+    recorded.
+    """
+
+    def __init__(self, path):
+        self.recordings = _load_snapshot(path)
+        self._positions = {}
+        self._lock = threading.Lock()
+
+    def urlopen(self,
+        method,
+        url,
+        body = None,
+        headers = None,
+        timeout = None,
+        deadline = None):
+        key = _recording_key(method, url, body, headers)
+        responses = self.recordings.get(key)
+        if not responses:
+            raise KeyError("No recorded response for %s %s" % (method, url))
+        with self._lock:
+            i = self._positions.get(key, 0)
+            self._positions[key] = i + 1
+        status, reason, data = responses[min(i, len(responses) - 1)]
+        if status >= 400:
+            raise urllib2.HTTPError(url, status, reason, None, StringIO(data))
+        return data
+
+    def rewind(self):
+        """
+        Start playing back from the first recorded response again.
+        """
+        with self._lock:
+            self._positions = {}
+
+def _recording_key(method, url, body, headers = None):
+    """
+    Return the key under which a request is recorded by `RecordingTransport`.
+    """
+    url, _, query = url.partition('?')
+    params = parse_qs(query) or {}
+    if body:
+        params.update(parse_qs(body))
+    # With the "Authorization" header, the token isn't in the URL or body, but
+    # it still needs to tell different users' requests apart.
+    match = AUTH_TOKEN_RE.search((headers or {}).get('Authorization', ''))
+    if match and 'oauth_token' not in params:
+        params['oauth_token'] = [urllib.unquote(match.group(1))]
+    items = [(k, v) for k, v in params.items()
+                        if k not in CACHE_DROP_PARAMETERS]
+    items.sort()
+    return (method, url, urllib.urlencode(items, True))
+
+class _LatencyWindow(object):
+    """
+    Keeps the most recent 'size' response times for an API method, for
+    working out hedge delays, and whether each of the most recent calls was
+    hedged, for limiting hedging.
+    """
+
+    def __init__(self, size = 100):
+        self.size = size
+        self.samples = []
+        self.hedged = []
+        # Positions of the oldest values, once the lists are full
+        self._next = {'samples': 0, 'hedged': 0}
+
+    def _append(self, name, value):
+        values = getattr(self, name)
+        if len(values) < self.size:
+            values.append(value)
+        else:
+            # Overwrite the oldest value
+            values[self._next[name]] = value
+            self._next[name] = (self._next[name] + 1) % self.size
+
+    def add(self, seconds):
+        self._append('samples', seconds)
+
+    def add_call(self, hedged):
+        self._append('hedged', hedged)
+
+    def can_hedge(self, limit):
+        """
+        Return True if hedging another call would keep the fraction of recent
+        calls that were hedged within 'limit'.
+        """
+        return sum(self.hedged) + 1 <= limit * (len(self.hedged) + 1)
+
+    def percentile(self, p):
+        """
+        Return the 'p'th percentile of the recorded response times, or None if
+        there are fewer than `HEDGE_MIN_SAMPLES` of them.
+        """
+        samples = sorted(self.samples)
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        i = int(round((len(samples) - 1) * p / 100.0))
+        return samples[i]
+
+def _make_cache_backend(type, path = '.'):
+    """
+    Return a cache backend for one of the `CACHE_*` types. Objects that already
+    implement the backend interface (see `MemoryCache`) are returned as-is.
+    """
+    if type == CACHE_MEMORY:
+        return MemoryCache()
+    elif type == CACHE_FILE:
+        return FileCache(path)
+    elif hasattr(type, 'invalidate'):
+        return type
+    raise ValueError("Unknown cache type: %r" % (type,))
+
 class VimeoClient(object):
 
     _app_name = None
 
+    _cache_backend = None
     _cache_dir = None
     _cache_enabled = None
+    _cache_error_expire = CACHE_ERROR_EXPIRE
     _cache_expire = 600
+    _cache_invalidates = CACHE_INVALIDATES
+    _cache_never = CACHE_NEVER
+    _cache_stale_if_error = 0
+    _cache_ttl = {}
+    _cache_error_ttl = {}
+    # Memoized results of `_get_cache_ttl`, reset by `enable_cache`
+    _cache_ttls = {}
+    # Set on clients handed out by a `VimeoClientPool`, which share one cache
+    # backend between all of the pool's tokens.
+    _cache_shared = False
+
+    # Shared by all instances unless a `VimeoClientPool` says otherwise.
+    _connection_pool = HTTPConnectionPool()
+    _latencies = {}
+
+    _timeout = 30
+    _deadline = None
+    _hedge_percentile = None
+    _hedge_limit = HEDGE_LIMIT
+
+    # Circuit breakers are shared between instances with the same settings
+    _breakers = {}
+    _breaker_per = 'method'
+    _breaker_reset_timeout = 30
+    _breaker_threshold = None
 
     _consumer_key = None
     _consumer_secret = None
@@ -105,35 +1027,68 @@ class VimeoClient(object):
         consumer_secret,
         token = None,
         token_secret = None,
-        app_name = None):
+        app_name = None,
+        connection_pool = None):
 
         self._consumer_key = consumer_key
         self._consumer_secret = consumer_secret
         self._app_name = app_name or ''
+        if connection_pool is not None:
+            self._connection_pool = connection_pool
 
         if token and token_secret:
             self.set_token(token, token_secret)
 
-    def _cache(self, params, response_data):
+    def _cache(self, params, response_data, expire):
         """
-        Cache an API response based on a hash of the parameters (minus certain
-        request-specific ones).
+        Cache an API response for 'expire' seconds based on a hash of the
+        parameters (minus certain request-specific ones).
         """
-        params = params.copy()
-        # Remove some unique things
-        for i in CACHE_DROP_PARAMETERS:
-            if i in params:
-                del params[i]
+        tags = self._cache_tags(params) + self._response_tags(response_data)
+        token = params.get('oauth_token')
+        if token:
+            # Lets a pooled client clear its own entries only
+            tags.append(('oauth_token', token))
 
-        params = urllib.urlencode(params)
-        hash = hashlib.md5(params).hexdigest()
+        self._cache_backend.set(self._cache_key(params), response_data,
+                                    time.time() + expire, tags)
 
-        if self._cache_enabled == CACHE_FILE:
-            f = os.path.join(self._cache_dir, hash, '.cache')
-            with open(f, 'w') as f:
-                pickle.dump(response_data, f)
-        elif self._cache_enabled == CACHE_MEMORY:
-            self._memory_cache[hash] = (response_data, time.time())
+    def _cache_key(self, params):
+        """
+        Return the cache key for a set of request parameters: an MD5 hash of
+        the parameters, minus certain request-specific ones.
+        """
+        items = [(k, v) for k, v in params.items()
+                            if k not in CACHE_DROP_PARAMETERS]
+        items.sort()
+        return hashlib.md5(urllib.urlencode(items)).hexdigest()
+
+    def _cache_tags(self, params, entities = CACHE_INDEX_PARAMETERS):
+        """
+        Return the index tags for the given request parameters and entity
+        names (see `CACHE_INDEX_PARAMETERS`). When caching, 'user' tags are only
+        added if none of the other entities are present.
+        """
+        tags = []
+        for name in entities:
+            if name != 'user' and params.get(name) is not None:
+                tags.append((name, str(params[name])))
+        if 'user' in entities or not tags:
+            for name in ('user_id', 'oauth_token'):
+                if params.get(name) is not None:
+                    tags.append(('user', str(params[name])))
+        return tags
+
+    def _check_response(self, method, response_data):
+        """
+        Return a decoded API response, or raise a `VimeoAPIError` if it is an
+        error response.
+        """
+        if response_data.get('stat') == 'ok':
+            return response_data
+        else:
+            error = response_data.get('err') or {}
+            raise VimeoAPIError(method, error.get('code'), error.get('msg'))
 
     def _generate_auth_header(self, oauth_params):
         """
@@ -202,31 +1157,115 @@ class VimeoClient(object):
         Return the contents of a cached request, or None if the request is not
         already in the cache.
         """
-        # Remove some unique things
-        params = params.copy()
-        for i in CACHE_DROP_PARAMETERS:
-            if i in params:
-                del params[i]
+        key = self._cache_key(params)
+        entry = self._cache_backend.get(key)
+        if entry is None:
+            return None
+
+        response_data, expires = entry
+        # Check to see if the entry is expired and remove it, unless it might
+        # still be served if the API fails
+        if expires < time.time():
+            if expires + self._cache_stale_if_error < time.time():
+                self._cache_backend.delete(key)
+            return None
+        return response_data
+
+    def _get_stale(self, params):
+        """
+        Return a successful cached response that has been expired for no more
+        than the stale-if-error window, or None.
+        """
+        if not self._cache_stale_if_error:
+            return None
+        entry = self._cache_backend.get(self._cache_key(params))
+        if entry is None:
+            return None
+        response_data, expires = entry
+        if expires + self._cache_stale_if_error >= time.time() and \
+        response_data.get('stat') == 'ok':
+            return response_data
+
+    def _get_breaker(self, method, url):
+        """
+        Return the circuit breaker for a request, or None if circuit breaking
+        is off.
+        """
+        if self._breaker_threshold is None:
+            return None
+        if self._breaker_per == 'endpoint' or not method:
+            key = url
+        else:
+            key = method
+        # Clients with different settings get separate breakers
+        key = (key, self._breaker_threshold, self._breaker_reset_timeout)
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = self._breakers.setdefault(key, CircuitBreaker(
+                        self._breaker_threshold, self._breaker_reset_timeout))
+        return breaker
+
+    def _get_cache_ttl(self, method, error = False):
+        """
+        Return the number of seconds to cache a response to 'method' for, or
+        None if it shouldn't be cached. 'error' selects the TTL for error
+        responses.
+        """
+        try:
+            return self._cache_ttls[(method, error)]
+        except KeyError:
+            pass
+
+        if self._is_write(method) or \
+        _match_method(dict.fromkeys(self._cache_never, True), method):
+            ttl = None
+        elif error:
+            ttl = _match_method(self._cache_error_ttl, method,
+                                        self._cache_error_expire)
+        else:
+            ttl = _match_method(self._cache_ttl, method, self._cache_expire)
+        self._cache_ttls[(method, error)] = ttl or None
+        return ttl or None
 
-        params = urllib.urlencode(params)
-        hash = hashlib.md5(params).hexdigest
+    def _get_hedge_delay(self, method):
+        """
+        Return the number of seconds to wait for a response to 'method' before
+        sending a hedged request, or None if too little is known about its
+        response times yet.
+        """
+        percentile = self._hedge_percentile or HEDGE_PERCENTILE
+        return self._get_latencies(method).percentile(percentile)
 
-        if self._cache_enabled == CACHE_FILE:
-            f = os.path.join(self._cache_dir, hash, '.cache')
-            # Check to see if the cache file is expired and remove it
-            last_modified = os.path.getmtime(f)
-            if f.endswith('.cache') and \
-            last_modified + self._cache_expire < time.time():
-                os.remove(f)
-            if os.path.exists(f):
-                with open(f) as f:
-                    return pickle.load(f)
-        elif self._cache_enabled == CACHE_MEMORY:
-            for k, v in self._memory_cache.items():
-                _, last_modified = v
-                if last_modified + self._cache_expire < time.time():
-                    del self._memory_cache[k]
-            return self._memory_cache.get(hash)
+    def _get_latencies(self, method):
+        latencies = self._latencies.get(method)
+        if latencies is None:
+            latencies = self._latencies.setdefault(method, _LatencyWindow())
+        return latencies
+
+    def _invalidate_cache(self, method, params):
+        """
+        Remove the cached responses affected by a successful call to the write
+        method 'method'.
+        """
+        entities = self._cache_invalidates.get(method)
+        if entities:
+            for tag in self._cache_tags(params, entities):
+                self._cache_backend.invalidate(tag)
+
+    def _is_idempotent(self, method):
+        """
+        Return True if 'method' can safely be sent twice, which rules out write
+        methods and anything that's never cached (like the upload methods).
+        """
+        return not self._is_write(method) and \
+            not _match_method(dict.fromkeys(self._cache_never, True), method)
+
+    def _is_write(self, method):
+        """
+        Return True if 'method' changes data (see `CACHE_WRITE_METHODS`).
+        """
+        return method in CACHE_WRITE_METHODS or \
+            method in self._cache_invalidates
 
     def _parse_token_string(self, tokenstring):
         """
@@ -248,25 +1287,37 @@ class VimeoClient(object):
         request_method = 'GET',
         url = API_REST_URL,
         cache = True,
-        use_auth_header = True):
+        use_auth_header = True,
+        timeout = None,
+        deadline = None,
+        hedge = None):
         """
         Call an API method. If the cache is enabled and you want to force the
         request to skip the cache, set the 'cache' parameter to False.
 
+        'timeout', 'deadline' and 'hedge' override the client-wide settings
+        made with `set_timeout` for this call.
+
         In the future, this will hopefully be modified to use an existing OAuth
         request library, like the requests provided in `oauth2` library.
         """
         if call_params is None:
             call_params = {}
         request_method = request_method.upper()
-
-        # Prepare oauth arguments
+        if timeout is None:
+            timeout = self._timeout
+        if deadline is None:
+            deadline = self._deadline
+        if deadline is not None:
+            # Budget in seconds for the whole call, hedges included
+            deadline = time.time() + deadline
+
+        # Prepare oauth arguments. The timestamp, nonce and signature are added
+        # when sending, as each (hedged) attempt needs its own.
         oauth_params = {
             'oauth_consumer_key': self._consumer_key,
             'oauth_version': '1.0',
             'oauth_signature_method': 'HMAC-SHA1',
-            'oauth_timestamp': int(time.time()),
-            'oauth_nonce': self._generate_nonce(),
         }
 
         # If we have a token, include it
@@ -285,19 +1336,168 @@ class VimeoClient(object):
             elif v is not None:
                 api_params[k] = v
 
-        # Generate the signature
-        signature_params = dict(oauth_params.items() + api_params.items())
-        oauth_params['oauth_signature'] = self._generate_signature(
-                                        signature_params, request_method, url)
-
         # Merge all args
         all_params = dict(oauth_params.items() + api_params.items())
 
-        # Return cached value
-        if self._cache_enabled:
+        if self._cache_enabled and cache:
+            # Write methods and the like are never cached
+            if method and self._get_cache_ttl(method) is None and \
+            self._get_cache_ttl(method, True) is None:
+                cache = False
+
+        # Return cached value. The cache key doesn't depend on the signature, so
+        # check before generating one. Cached error responses raise again.
+        if self._cache_enabled and cache:
             response_data = self._get_cached(all_params)
-            if cache and response_data:
+            if response_data:
+                return self._check_response(method, response_data)
+
+        # Only cached responses can be served stale
+        stale = self._cache_enabled and cache and method
+        breaker = self._get_breaker(method, url)
+        if breaker is not None and not breaker.allow():
+            response_data = stale and self._get_stale(all_params)
+            if response_data:
                 return response_data
+            raise VimeoCircuitOpenError(method,
+                            msg = "Too many failed requests; not retrying yet.")
+
+        def send():
+            return self._send_request(method, oauth_params, api_params,
+                        request_method, url, use_auth_header, timeout, deadline)
+
+        if hedge is None:
+            hedge = self._hedge_percentile is not None
+        try:
+            if hedge and method and request_method == 'GET' and \
+            self._is_idempotent(method):
+                response = self._send_hedged(method, send)
+            else:
+                response = send()
+        except Exception:
+            e = sys.exc_info()[1]
+            outage = _is_outage(e)
+            if breaker is not None:
+                if outage:
+                    breaker.failure()
+                elif isinstance(e, VimeoDeadlineError):
+                    # The caller gave up; that says nothing about the API
+                    breaker.release()
+                else:
+                    # Any other error means the API did respond
+                    breaker.success()
+            if outage:
+                response_data = stale and self._get_stale(all_params)
+                if response_data:
+                    return response_data
+            raise
+        if breaker is not None:
+            breaker.success()
+
+        if method:
+            response_data = json_decode(response)
+
+            ok = response_data.get('stat') == 'ok'
+
+            # Cache the response
+            if self._cache_enabled and cache:
+                expire = self._get_cache_ttl(method, not ok)
+                if expire:
+                    self._cache(all_params, response_data, expire)
+
+            if ok and self._cache_backend is not None:
+                self._invalidate_cache(method, all_params)
+            return self._check_response(method, response_data)
+        else:
+            return response
+
+    def _response_tags(self, response_data):
+        """
+        Return index tags for the videos listed in a response (by
+        `albums.getVideos`, for instance), so that writes to any of those videos
+        invalidate the listing as well.
+        """
+        videos = response_data.get('videos')
+        if isinstance(videos, dict):
+            videos = videos.get('video')
+        if isinstance(videos, dict):
+            # A single item isn't always wrapped in a list
+            videos = [videos]
+        tags = []
+        for video in videos or ():
+            if isinstance(video, dict) and video.get('id') is not None:
+                tags.append(('video_id', str(video['id'])))
+        return tags
+
+    def _send_hedged(self, method, send):
+        """
+        Call 'send' and, if it hasn't returned within the hedge delay for
+        'method', call it again in parallel (unless too many recent calls have
+        been hedged already). Returns the first successful response, or raises
+        the last error if every attempt fails.
+        """
+        delay = self._get_hedge_delay(method)
+        latencies = self._get_latencies(method)
+        if delay is None:
+            latencies.add_call(False)
+            return send()
+
+        results = Queue.Queue()
+        def attempt():
+            try:
+                results.put((True, send()))
+            except Exception:
+                results.put((False, sys.exc_info()[1]))
+
+        def start():
+            t = threading.Thread(target = attempt)
+            t.setDaemon(True)
+            t.start()
+
+        start()
+        pending = 1
+        hedged = False
+        try:
+            ok, result = results.get(True, delay)
+            pending -= 1
+        except Queue.Empty:
+            # Still waiting on the first attempt; send the hedge
+            hedged = latencies.can_hedge(self._hedge_limit)
+            if hedged:
+                start()
+                pending += 1
+        latencies.add_call(hedged)
+
+        while pending:
+            ok, result = results.get()
+            pending -= 1
+            if ok:
+                return result
+        if ok:
+            return result
+        raise result
+
+    def _send_request(self,
+        method,
+        oauth_params,
+        api_params,
+        request_method,
+        url,
+        use_auth_header,
+        timeout,
+        deadline):
+        """
+        Sign and send a single request, returning the response body.
+        """
+        oauth_params = oauth_params.copy()
+        oauth_params['oauth_timestamp'] = int(time.time())
+        oauth_params['oauth_nonce'] = self._generate_nonce()
+
+        # Generate the signature
+        all_params = dict(oauth_params.items() + api_params.items())
+        oauth_params['oauth_signature'] = self._generate_signature(
+                                        all_params, request_method, url)
+        all_params['oauth_signature'] = oauth_params['oauth_signature']
 
         # Request options
         if use_auth_header:
@@ -318,39 +1518,19 @@ class VimeoClient(object):
         if use_auth_header:
             headers.update(self._generate_auth_header(oauth_params))
 
+        body = None
         if request_method == 'POST':
-            request = urllib2.Request(request_url, urllib.urlencode(items),
-                        headers = headers)
-        else:
-            request = urllib2.Request(request_url, headers = headers)
+            body = urllib.urlencode(params)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
 
+        started = time.time()
         try:
-            response = urllib2.urlopen(request, timeout = 30)
-        except TypeError:
-            # Old version of Python that doesn't accept a timeout argument
-            old_default = socket.getdefaulttimeout()
-            socket.setdefaulttimeout(30)
-            response = urllib2.urlopen(request)
-            # Set it back immediately so that we don't screw anything up. I
-            # don't think this is thread-safe.
-            socket.setdefaulttimeout(old_default)
-
-        if method:
-            response_data = response.read()
-            response_data = json_decode(response_data)
-
-            # Cache the response
-            if self._cache_enabled and cache:
-                self._cache(all_params, response_data)
-
-            if response_data.get('stat') == 'ok':
-                return response_data
-            else:
-                error = response_data.get('err')
-                raise VimeoAPIError(method, error.get('code'),
-                                            error.get('msg'))
-        else:
-            return response.read()
+            return self._connection_pool.urlopen(request_method, request_url,
+                                            body, headers, timeout, deadline)
+        finally:
+            if method:
+                # Failures count too, so that timeouts raise the hedge delay
+                self._get_latencies(method).add(time.time() - started)
 
     def _url_encode_rfc3986(self, input):
         """
@@ -386,19 +1566,36 @@ class VimeoClient(object):
         params = None,
         request_method = 'GET',
         url = API_REST_URL,
-        cache = True):
+        cache = True,
+        timeout = None,
+        deadline = None,
+        hedge = None):
         """
         Call an API method. If the method requires an active/valid token, you
         should set it with `set_token` before calling this method.
+
+        'timeout' and 'deadline' override the client-wide values set with
+        `set_timeout` for this call. 'hedge' can be set to True or False to
+        turn hedged requests on or off for this call.
         """
         if not params:
             params = {}
 
         if not method.startswith('vimeo.'):
             method = 'vimeo.' + method
-        return self._request(method, params, request_method, url, cache)
-
-    def enable_cache(self, type, path = '.', expire = 600):
+        return self._request(method, params, request_method, url, cache, True,
+                                                    timeout, deadline, hedge)
+
+    def enable_cache(self,
+        type,
+        path = '.',
+        expire = 600,
+        invalidates = None,
+        ttl = None,
+        error_expire = CACHE_ERROR_EXPIRE,
+        error_ttl = None,
+        never = None,
+        stale_if_error = 0):
         """
         Enable the cache, or switch between cache types. Current cache types are
         as follows:
@@ -407,14 +1604,50 @@ class VimeoClient(object):
                              is pickled/unpickled automatically when it is saved
                              to and loaded from files.
         vimeo.CACHE_MEMORY - Store request information in memory (in a
-                             `_memory_cache` attribute of the currentinstance).
+                             `MemoryCache` attached to the current instance).
+
+        'type' can also be a cache backend object, such as a `MemoryCache` or
+        `FileCache` instance, or anything implementing the same methods.
+
+        'invalidates', if set, replaces the mapping of write methods to the
+        entities they change (see `CACHE_INVALIDATES`). The 'vimeo.' prefix is
+        optional in its keys. Leaving a method out of it doesn't make the method
+        cacheable; see `CACHE_WRITE_METHODS`.
+
+        Successful responses are cached for 'expire' seconds, and error
+        responses (which raise `VimeoAPIError` again when read from the cache)
+        for 'error_expire' seconds. 'ttl' and 'error_ttl' override these per
+        method, and are dictionaries mapping method names or glob patterns (like
+        'videos.upload.*') to a number of seconds; 0 disables caching. 'never',
+        if set, replaces the list of methods and patterns that are never cached
+        (see `CACHE_NEVER`).
+
+        'stale_if_error' is the number of seconds expired responses are kept
+        for after they expire. Within that window, they are returned if the
+        API can't be reached or returns a server error, or while a circuit
+        breaker is open (see `set_circuit_breaker`).
         """
-        self._cache_enabled = type
-        if type == CACHE_MEMORY:
-            self._memory_cache = {}
-        elif type == CACHE_FILE:
+        self._cache_backend = _make_cache_backend(type, path)
+        self._cache_enabled = getattr(self._cache_backend, 'type', type)
+        if self._cache_enabled == CACHE_FILE:
             self._cache_dir = path
         self._cache_expire = expire
+        self._cache_error_expire = error_expire
+        self._cache_ttl = ttl or {}
+        self._cache_error_ttl = error_ttl or {}
+        if invalidates is not None:
+            # The 'vimeo.' prefix is optional, as for 'ttl'
+            self._cache_invalidates = {}
+            for k, v in invalidates.items():
+                if not k.startswith('vimeo.'):
+                    k = 'vimeo.' + k
+                self._cache_invalidates[k] = v
+        if never is not None:
+            self._cache_never = never
+        self._cache_stale_if_error = stale_if_error
+        if hasattr(self._cache_backend, 'grace'):
+            self._cache_backend.grace = stale_if_error
+        self._cache_ttls = {}
 
     def disable_cache(self):
         """
@@ -428,14 +1661,47 @@ class VimeoClient(object):
         Empty the cache. Defaults to the active cache type. If no cache type is
         active, and 'cache_type' is not set, nothing will be removed.
         """
-        type = cache_type or self.__cache_enabled
-        if type == CACHE_MEMORY:
-            self._memory_cache = {}
-        elif type == CACHE_FILE and self._cache_dir:
-            files = os.path.listdir(self._cache_dir)
-            files = filter(lambda f: f.endswith('.cache'), files)
-            for f in files:
-                os.remove(f)
+        type = cache_type or self._cache_enabled
+        backend = self._cache_backend
+        if not type or backend is None:
+            return
+        if self._cache_shared:
+            # Other tokens share this backend; only remove our own entries.
+            if self._token:
+                backend.invalidate(('oauth_token', self._token))
+        elif type == getattr(backend, 'type', type):
+            backend.clear()
+
+    def export_cache(self, file):
+        """
+        Write the unexpired entries in the cache to 'file' (a path or a
+        file-like object) as a compressed snapshot, which `import_cache` can
+        load to pre-warm the cache of another process. Returns the number of
+        entries written.
+        """
+        entries = []
+        if self._cache_backend is not None:
+            now = time.time()
+            entries = [e for e in self._cache_backend.items() if e[2] >= now]
+        _dump_snapshot(entries, file)
+        return len(entries)
+
+    def import_cache(self, file):
+        """
+        Load a snapshot written by `export_cache` from 'file' (a path or a
+        file-like object) into the cache, skipping entries that have expired
+        since. The cache must be enabled first. Returns the number of entries
+        loaded.
+        """
+        if self._cache_backend is None:
+            raise ValueError("The cache is not enabled.")
+        now = time.time()
+        count = 0
+        for key, value, expires, tags in _load_snapshot(file):
+            if expires >= now:
+                self._cache_backend.set(key, value, expires, tags)
+                count += 1
+        return count
 
     def get_access_token(self, verifier):
         """
@@ -479,6 +1745,48 @@ class VimeoClient(object):
         """
         return self._token, self._token_secret
 
+    def set_circuit_breaker(self,
+        threshold = 5,
+        reset_timeout = 30,
+        per = 'method'):
+        """
+        Turn on circuit breakers, or turn them off if 'threshold' is None. After
+        'threshold' consecutive failed requests (network errors, timeouts and
+        5xx responses) to an API method, or to an endpoint URL if 'per' is
+        'endpoint', further requests fail fast with a `VimeoCircuitOpenError`
+        for 'reset_timeout' seconds, or return a stale cached response if there
+        is one (see the 'stale_if_error' argument of `enable_cache`). Then a
+        single probe request is made to see if the API has recovered.
+
+        Circuit breakers are shared by all clients with the same 'threshold'
+        and 'reset_timeout' settings.
+        """
+        self._breaker_threshold = threshold
+        self._breaker_reset_timeout = reset_timeout
+        self._breaker_per = per
+
+    def set_timeout(self,
+        timeout = 30,
+        deadline = None,
+        hedge_percentile = None,
+        hedge_limit = HEDGE_LIMIT):
+        """
+        Set the timeouts for future requests. 'timeout' is either a number of
+        seconds, or a 2-tuple of separate (connect, read) timeouts. 'deadline',
+        if set, is the total number of seconds a call may take, including any
+        hedged requests.
+
+        If 'hedge_percentile' is set (to 95, say), read-only GET requests that
+        haven't been answered within that percentile of the method's recent
+        response times are sent a second time, and the first response wins.
+        Failed requests count towards the response times too. No more than the
+        fraction 'hedge_limit' of recent calls to a method are hedged.
+        """
+        self._timeout = timeout
+        self._deadline = deadline
+        self._hedge_percentile = hedge_percentile
+        self._hedge_limit = hedge_limit
+
     def set_token(self, token, token_secret):
         """
         Set the OAuth token for future requests.
@@ -568,4 +1876,112 @@ class VimeoClient(object):
             return complete['ticket']['video_id'], errors
         else:
             raise VimeoAPIError(method, complete['err']['code'],
-                            complete['err']['msg'])
\ No newline at end of file
+                            complete['err']['msg'])
+
+class VimeoClientPool(object):
+    """
+    Hands out lightweight `VimeoClient` instances ("views") for the many users
+    of a single app. Every view created by a pool shares the pool's HTTP
+    connections and cache backend, so creating one per web request is cheap and
+    warm connections and cache entries survive between requests. Cache entries
+    are partitioned by token: calling `clear_cache` on a view only removes the
+    entries for that view's token.
+
+    Use `VimeoClientPool.get` to share a single pool per set of consumer
+    credentials across a process.
+    """
+
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+    def __repr__(self):
+        app = ''
+        if self._template._app_name:
+            app = '-%s' % self._template._app_name
+        return "<VimeoClientPool%s: %s>" % (app, self._template._consumer_key)
+
+    def __init__(self,
+        consumer_key,
+        consumer_secret,
+        app_name = None,
+        connection_pool = None):
+
+        # Clients are created by copying the state of this one
+        self._template = VimeoClient(consumer_key, consumer_secret,
+                                            app_name = app_name)
+        self._template._connection_pool = connection_pool or \
+                                            HTTPConnectionPool()
+        self._template._cache_shared = True
+
+    @classmethod
+    def get(cls, consumer_key, consumer_secret, app_name = None):
+        """
+        Return the process-wide pool for a set of consumer credentials,
+        creating it if necessary.
+        """
+        key = (consumer_key, consumer_secret, app_name or '')
+        with cls._pools_lock:
+            pool = cls._pools.get(key)
+            if pool is None:
+                pool = cls._pools[key] = cls(consumer_key, consumer_secret,
+                                                                    app_name)
+        return pool
+
+    def client(self, token = None, token_secret = None):
+        """
+        Return a `VimeoClient` for the given token that shares this pool's
+        connections and cache.
+        """
+        # Skip `__init__`; everything it sets up is already in the template.
+        client = VimeoClient.__new__(VimeoClient)
+        client.__dict__.update(self._template.__dict__)
+        if token and token_secret:
+            client.set_token(token, token_secret)
+        return client
+
+    def set_circuit_breaker(self, *args, **kwargs):
+        """
+        Set up circuit breakers for clients created after this call. Accepts
+        the same arguments as `VimeoClient.set_circuit_breaker`.
+        """
+        self._template.set_circuit_breaker(*args, **kwargs)
+
+    def set_timeout(self, *args, **kwargs):
+        """
+        Set the timeouts for clients created after this call. Accepts the same
+        arguments as `VimeoClient.set_timeout`.
+        """
+        self._template.set_timeout(*args, **kwargs)
+
+    def enable_cache(self, *args, **kwargs):
+        """
+        Enable the cache shared by clients created after this call. Accepts the
+        same arguments as `VimeoClient.enable_cache`.
+        """
+        self._template.enable_cache(*args, **kwargs)
+
+    def disable_cache(self):
+        """
+        Disable the cache for clients created after this call.
+        """
+        self._template.disable_cache()
+
+    def clear_cache(self):
+        """
+        Empty the shared cache for every token.
+        """
+        if self._template._cache_backend is not None:
+            self._template._cache_backend.clear()
+
+    def export_cache(self, file):
+        """
+        Write the shared cache, for every token, to a snapshot. See
+        `VimeoClient.export_cache`.
+        """
+        return self._template.export_cache(file)
+
+    def import_cache(self, file):
+        """
+        Load a snapshot into the shared cache. See `VimeoClient.import_cache`.
+        """
+        return self._template.import_cache(file)
@@ -0,0 +1,445 @@
+"""
+A local, indexed copy of a Vimeo user's videos, albums and channels.
+
+`CatalogueMirror` uses a `VimeoClient` to copy a user's catalogue into an
+SQLite database, and answers questions about it (like "which of our videos are
+longer than 10 minutes?") without making any API calls:
+
+    client = vimeo.VimeoClient(key, secret, token, token_secret)
+    mirror = CatalogueMirror(client, 'catalogue.db')
+    mirror.sync()
+    long_videos = mirror.find_videos(min_duration = 600)
+
+Pages of results, and the video lists of albums and channels, are fetched in
+parallel. `sync` can be called as often as you like: videos, albums and
+channels are only rewritten when their modification timestamps change, and
+album and channel contents are only fetched again when the album or channel
+itself has changed.
+
+Copyright (c) 2014 Artlogic Media Ltd. http://artlogic.net
+Released under the MIT or GPLv3 licenses.
+"""
+
+import math
+import Queue
+import sys
+import threading
+import time
+
+import sqlite3
+
+from vimeo import pickle
+
+__all__ = ['CatalogueMirror']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    id TEXT PRIMARY KEY,
+    title TEXT,
+    duration INTEGER,
+    upload_date TEXT,
+    modified_date TEXT,
+    version TEXT,
+    privacy TEXT,
+    plays INTEGER,
+    data BLOB
+);
+CREATE INDEX IF NOT EXISTS videos_duration ON videos (duration);
+CREATE INDEX IF NOT EXISTS videos_upload_date ON videos (upload_date);
+CREATE TABLE IF NOT EXISTS albums (
+    id TEXT PRIMARY KEY,
+    title TEXT,
+    modified_date TEXT,
+    version TEXT,
+    total_videos INTEGER,
+    data BLOB
+);
+CREATE TABLE IF NOT EXISTS channels (
+    id TEXT PRIMARY KEY,
+    title TEXT,
+    modified_date TEXT,
+    version TEXT,
+    total_videos INTEGER,
+    data BLOB
+);
+CREATE TABLE IF NOT EXISTS members (
+    container TEXT,
+    container_id TEXT,
+    video_id TEXT,
+    PRIMARY KEY (container, container_id, video_id)
+);
+CREATE INDEX IF NOT EXISTS members_video ON members (video_id);
+CREATE TABLE IF NOT EXISTS sync_state (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# How each part of the catalogue is listed: the API method, the keys of the
+# list in the response, and the method that lists a container's videos.
+LISTINGS = {
+    'videos': ('vimeo.videos.getAll', 'videos', 'video', None),
+    'albums': ('vimeo.albums.getAll', 'albums', 'album',
+                                        'vimeo.albums.getVideos'),
+    'channels': ('vimeo.channels.getModerated', 'channels', 'channel',
+                                        'vimeo.channels.getVideos'),
+}
+
+# The API doesn't name modification timestamps consistently
+MODIFIED_KEYS = ('modified_date', 'last_modified', 'modified_on')
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _modified(item):
+    for k in MODIFIED_KEYS:
+        if item.get(k):
+            return item[k]
+
+def _container_version(item):
+    # Adding a video doesn't necessarily touch the modification timestamp
+    modified = _modified(item)
+    if modified:
+        return '%s/%s' % (modified, item.get('total_videos'))
+
+class CatalogueMirror(object):
+    """
+    Mirrors the videos, albums and channels of 'user_id' (or of the client's
+    token's user, if not set) into the SQLite database at 'path'. Up to
+    'workers' pages (of any listing) are fetched at once.
+    """
+
+    def __repr__(self):
+        return "<CatalogueMirror: %s>" % self.path
+
+    def __init__(self,
+        client,
+        path = ':memory:',
+        user_id = None,
+        workers = 4,
+        per_page = 50):
+
+        self.client = client
+        self.path = path
+        self.user_id = user_id
+        self.workers = workers
+        self.per_page = per_page
+
+        self._db = sqlite3.connect(path)
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+
+    def _parallel(self, func, args):
+        """
+        Return [func(arg) for arg in args], calling 'func' on up to 'workers'
+        threads at once. The first exception raised is re-raised.
+        """
+        if len(args) <= 1:
+            return [func(arg) for arg in args]
+
+        todo = Queue.Queue()
+        for i, arg in enumerate(args):
+            todo.put((i, arg))
+        results = {}
+        errors = []
+
+        def worker():
+            while not errors:
+                try:
+                    i, arg = todo.get_nowait()
+                except Queue.Empty:
+                    return
+                try:
+                    results[i] = func(arg)
+                except Exception:
+                    errors.append(sys.exc_info())
+
+        threads = [threading.Thread(target = worker)
+                    for i in range(min(self.workers, len(args)))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        if errors:
+            raise errors[0][0], errors[0][1], errors[0][2]
+        return [results[i] for i in range(len(args))]
+
+    def _fetch_many(self, listings):
+        """
+        Return every item of each of a list of paged listings, given as
+        (method, params, list_key, item_key) tuples. The first pages are
+        fetched to find the number of pages, and then the rest are fetched,
+        all in parallel.
+
+        Returns a list of 2-tuples of the items and whether the listing is
+        complete. If items are added or removed while the pages are fetched,
+        the pages shift: items can be missed or listed twice, and the number
+        of items no longer matches the total reported by the first page.
+        """
+        def fetch_page(job):
+            i, page = job
+            method, params, list_key, item_key = listings[i]
+            page_params = dict(params, page = page, per_page = self.per_page)
+            rsp = self.client.call(method, page_params, cache = False)
+            listing = rsp.get(list_key) or {}
+            items = listing.get(item_key) or []
+            if isinstance(items, dict):
+                # A single item isn't always wrapped in a list
+                items = [items]
+            return _int(listing.get('total')), items
+
+        first = self._parallel(fetch_page,
+                                [(i, 1) for i in range(len(listings))])
+        jobs = []
+        for i, (total, items) in enumerate(first):
+            pages = int(math.ceil((total or 0) / float(self.per_page)))
+            jobs.extend([(i, page) for page in range(2, pages + 1)])
+
+        # Jobs are in listing and page order, so the pages can be appended
+        results = [items for total, items in first]
+        for (i, page), (total, items) in zip(jobs,
+                                            self._parallel(fetch_page, jobs)):
+            results[i].extend(items)
+
+        for i, items in enumerate(results):
+            seen = set()
+            unique = []
+            for item in items:
+                if str(item['id']) not in seen:
+                    seen.add(str(item['id']))
+                    unique.append(item)
+            total = first[i][0]
+            results[i] = (unique, total is None or len(unique) == total)
+        return results
+
+    def _fetch(self, method, params, list_key, item_key):
+        """
+        Return every item of a paged listing, and whether it is complete (see
+        `_fetch_many`).
+        """
+        return self._fetch_many([(method, params, list_key, item_key)])[0]
+
+    def _params(self):
+        params = {'full_response': 1}
+        if self.user_id:
+            params['user_id'] = self.user_id
+        return params
+
+    def _diff_table(self, table, items, version = _modified):
+        """
+        Compare 'items' with the rows of 'table'. Returns a 2-tuple of the
+        items whose version (by default, the modification timestamp) has
+        changed or that are new, and the ids of rows that no longer exist.
+        """
+        known = dict(self._db.execute(
+                        'SELECT id, version FROM %s' % table).fetchall())
+        changed = []
+        for item in items:
+            item_version = version(item)
+            if not item_version or \
+            known.pop(str(item['id']), None) != item_version:
+                known.pop(str(item['id']), None)
+                changed.append(item)
+        # Anything left over no longer exists
+        return changed, known.keys()
+
+    def _write_table(self, table, changed, removed, columns,
+                                                version = _modified):
+        """
+        Write the 'changed' items to 'table' and delete the 'removed' ids.
+        'columns' maps column names to functions that extract their values
+        from an item.
+        """
+        names = ['id', 'modified_date', 'version'] + columns.keys() + ['data']
+        sql = 'INSERT OR REPLACE INTO %s (%s) VALUES (%s)' % \
+                (table, ', '.join(names), ', '.join('?' * len(names)))
+        for item in changed:
+            values = [str(item['id']), _modified(item), version(item)]
+            values.extend([f(item) for f in columns.values()])
+            values.append(sqlite3.Binary(
+                            pickle.dumps(item, pickle.HIGHEST_PROTOCOL)))
+            self._db.execute(sql, values)
+        for id in removed:
+            self._db.execute('DELETE FROM %s WHERE id = ?' % table, (id,))
+
+    def _fetch_members(self, container, ids):
+        """
+        Return a list of the video lists of each of the 'container' (album or
+        channel) ids, with whether each is complete (see `_fetch_many`).
+        """
+        method = LISTINGS[container][3]
+        id_param = container[:-1] + '_id'
+        return self._fetch_many([(method, {id_param: id}, 'videos', 'video')
+                                    for id in ids])
+
+    def _write_members(self, container, ids, members, removed):
+        """
+        Replace the video lists of the 'container' ids with 'members', and
+        drop the lists for the 'removed' ones.
+        """
+        for id in removed:
+            self._db.execute(
+                'DELETE FROM members WHERE container = ? AND container_id = ?',
+                (container, id))
+        for id, videos in zip(ids, members):
+            self._db.execute(
+                'DELETE FROM members WHERE container = ? AND container_id = ?',
+                (container, id))
+            self._db.executemany('INSERT OR IGNORE INTO members '
+                '(container, container_id, video_id) VALUES (?, ?, ?)',
+                [(container, id, str(v['id'])) for v in videos])
+
+    def sync(self):
+        """
+        Bring the mirror up to date. Returns a dictionary mapping 'videos',
+        'albums' and 'channels' to the number of rows added, updated or
+        removed. If anything fails, the mirror is left as it was.
+        """
+        try:
+            counts = self._sync()
+            self._db.execute('INSERT OR REPLACE INTO sync_state (name, value) '
+                            'VALUES (?, ?)', ('last_sync', str(time.time())))
+            self._db.commit()
+        except:
+            self._db.rollback()
+            raise
+        return counts
+
+    def _sync(self):
+        counts = {}
+        params = self._params()
+
+        method, list_key, item_key, _ = LISTINGS['videos']
+        items, complete = self._fetch(method, params, list_key, item_key)
+        changed, removed = self._diff_table('videos', items)
+        if not complete:
+            # The listing changed while it was being fetched, so anything
+            # missing from it may just have been missed. Check next time.
+            removed = []
+        self._write_table('videos', changed, removed, {
+            'title': lambda v: v.get('title'),
+            'duration': lambda v: _int(v.get('duration')),
+            'upload_date': lambda v: v.get('upload_date'),
+            'privacy': lambda v: v.get('privacy'),
+            'plays': lambda v: _int(v.get('number_of_plays')),
+        })
+        if removed:
+            self._db.executemany('DELETE FROM members WHERE video_id = ?',
+                                    [(id,) for id in removed])
+        counts['videos'] = len(changed) + len(removed)
+
+        for container in ('albums', 'channels'):
+            method, list_key, item_key, _ = LISTINGS[container]
+            items, complete = self._fetch(method, params, list_key, item_key)
+            changed, removed = self._diff_table(container, items,
+                                                    _container_version)
+            if not complete:
+                removed = []
+            # Fetch the video lists before recording the new versions, so
+            # that a failure here means they're fetched again next time.
+            # Likewise, skip containers whose lists changed while being
+            # fetched.
+            ids = [str(c['id']) for c in changed]
+            fetched = self._fetch_members(container, ids)
+            changed = [c for c, (videos, complete) in zip(changed, fetched)
+                        if complete]
+            ids = [str(c['id']) for c in changed]
+            members = [videos for videos, complete in fetched if complete]
+            self._write_table(container, changed, removed, {
+                'title': lambda c: c.get('title') or c.get('name'),
+                'total_videos': lambda c: _int(c.get('total_videos')),
+            }, _container_version)
+            self._write_members(container, ids, members, removed)
+            counts[container] = len(changed) + len(removed)
+        return counts
+
+    def last_sync(self):
+        """
+        Return the time (as returned by `time.time`) of the last successful
+        `sync`, or None if the mirror has never been synced.
+        """
+        row = self._db.execute('SELECT value FROM sync_state '
+                                'WHERE name = ?', ('last_sync',)).fetchone()
+        if row:
+            return float(row[0])
+
+    def _load(self, rows):
+        return [pickle.loads(str(row[0])) for row in rows]
+
+    def get_video(self, video_id):
+        """
+        Return the mirrored API data for a video, or None.
+        """
+        videos = self._load(self._db.execute(
+                    'SELECT data FROM videos WHERE id = ?', (str(video_id),)))
+        if videos:
+            return videos[0]
+
+    def find_videos(self,
+        min_duration = None,
+        max_duration = None,
+        album_id = None,
+        channel_id = None,
+        privacy = None,
+        uploaded_after = None,
+        uploaded_before = None,
+        order_by = 'upload_date DESC',
+        limit = None):
+        """
+        Return the mirrored API data for the videos matching every filter
+        given. Durations are in seconds, and upload dates are compared as
+        'YYYY-MM-DD HH:MM:SS' strings. 'order_by' is an SQL ORDER BY clause
+        over the columns of the videos table.
+        """
+        where = []
+        args = []
+        for clause, value in (
+            ('duration >= ?', min_duration),
+            ('duration <= ?', max_duration),
+            ('privacy = ?', privacy),
+            ('upload_date > ?', uploaded_after),
+            ('upload_date < ?', uploaded_before)):
+            if value is not None:
+                where.append(clause)
+                args.append(value)
+        for container, id in (('albums', album_id), ('channels', channel_id)):
+            if id is not None:
+                where.append('id IN (SELECT video_id FROM members '
+                                'WHERE container = ? AND container_id = ?)')
+                args.extend([container, str(id)])
+
+        sql = 'SELECT data FROM videos'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        if order_by:
+            sql += ' ORDER BY ' + order_by
+        if limit is not None:
+            sql += ' LIMIT %d' % limit
+        return self._load(self._db.execute(sql, args))
+
+    def get_albums(self):
+        """
+        Return the mirrored API data for every album.
+        """
+        return self._load(self._db.execute(
+                            'SELECT data FROM albums ORDER BY title'))
+
+    def get_channels(self):
+        """
+        Return the mirrored API data for every channel.
+        """
+        return self._load(self._db.execute(
+                            'SELECT data FROM channels ORDER BY title'))
+
+    def query(self, sql, args = ()):
+        """
+        Run an arbitrary SQL query against the mirror and return the rows. See
+        `SCHEMA` for the tables.
+        """
+        return self._db.execute(sql, args).fetchall()
+
+    def close(self):
+        self._db.close()